@@ -0,0 +1,177 @@
+# landmark_recording.py
+import os
+import struct
+import time
+from typing import Any, NamedTuple, Optional, Union
+
+import numpy as np
+
+# File layout (little-endian):
+#   32-byte header: magic, version, dtype code, landmark count, values per
+#                   landmark, padding, 16-byte ASCII label (e.g. exercise type)
+#   N fixed-size records: float64 timestamp + (33, 4) landmarks
+# Records are only ever appended, so a partially written trailing record
+# (e.g. after a crash) is simply ignored when reading.
+MAGIC = b"FPLM"
+FORMAT_VERSION = 1
+NUM_LANDMARKS = 33
+VALUES_PER_LANDMARK = 4  # x, y, z, visibility
+FILE_EXTENSION = ".fplm"
+
+# Buffered frames are written out at least this often so a crash loses little
+FLUSH_EVERY_FRAMES = 30
+FLUSH_INTERVAL_SECONDS = 2.0
+
+_HEADER = struct.Struct("<4sBBHH6x16s")
+HEADER_SIZE = _HEADER.size
+
+_DTYPE_CODES = {np.dtype(np.float16): 2, np.dtype(np.float32): 4}
+_CODE_DTYPES = {code: dtype for dtype, code in _DTYPE_CODES.items()}
+
+class Landmark(NamedTuple):
+    """Stand-in for a MediaPipe landmark, rebuilt from a recorded frame."""
+    x: float
+    y: float
+    z: float
+    visibility: float
+
+class LandmarkRecording(NamedTuple):
+    """Memory-mapped view of a recording; arrays are backed by the file."""
+    label: str
+    timestamps: np.ndarray  # (frames,) float64
+    landmarks: np.ndarray   # (frames, 33, 4) float16 or float32
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+def record_dtype(dtype: Union[str, np.dtype] = np.float16) -> np.dtype:
+    """Return the structured dtype of one on-disk frame record."""
+    dtype = np.dtype(dtype)
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Unsupported landmark dtype {dtype}; use float16 or float32")
+    return np.dtype([
+        ("timestamp", "<f8"),
+        ("landmarks", dtype.newbyteorder("<"), (NUM_LANDMARKS, VALUES_PER_LANDMARK)),
+    ])
+
+def landmarks_to_array(landmarks: Any) -> np.ndarray:
+    """Convert MediaPipe landmarks (or a (33, 4) array-like) to a float32 array."""
+    if hasattr(landmarks, "landmark"):
+        landmarks = landmarks.landmark
+    if len(landmarks) and hasattr(landmarks[0], "x"):
+        return np.array(
+            [[lm.x, lm.y, lm.z, lm.visibility] for lm in landmarks], dtype=np.float32
+        )
+    array = np.asarray(landmarks, dtype=np.float32)
+    if array.shape != (NUM_LANDMARKS, VALUES_PER_LANDMARK):
+        raise ValueError(
+            f"Expected landmarks of shape ({NUM_LANDMARKS}, {VALUES_PER_LANDMARK}), got {array.shape}"
+        )
+    return array
+
+def frame_landmarks(frame: np.ndarray) -> list:
+    """Turn one recorded (33, 4) frame into landmark objects the analyzers accept."""
+    return [Landmark(*row) for row in frame.astype(np.float32).tolist()]
+
+class LandmarkRecorder:
+    """
+    Append pose landmarks for one session to a recording file.
+    The file is only created on the first append, so sessions that never
+    produce landmarks leave nothing behind.
+    """
+
+    def __init__(self, path: str, dtype: Union[str, np.dtype] = np.float16, label: str = ""):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._record = np.zeros(1, dtype=record_dtype(self.dtype))
+        self.frames = 0
+        self._file = None
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            existing_label, existing_dtype = _read_header(path)
+            if existing_dtype != self.dtype:
+                raise ValueError(f"{path} stores {existing_dtype}, cannot append {self.dtype}")
+            self.label = existing_label
+            self._encoded_label = None
+        else:
+            try:
+                self._encoded_label = label.encode("ascii")
+            except UnicodeEncodeError:
+                raise ValueError(f"Recording label must be ASCII, got {label!r}")
+            if len(self._encoded_label) > 16:
+                raise ValueError(f"Recording label must be at most 16 characters, got {label!r}")
+            self.label = label
+
+    def _open(self) -> None:
+        if self._encoded_label is None:
+            self._file = open(self.path, "r+b")
+            # Drop any torn trailing record so new frames stay aligned
+            itemsize = self._record.dtype.itemsize
+            size = os.path.getsize(self.path)
+            self._file.truncate(HEADER_SIZE + (size - HEADER_SIZE) // itemsize * itemsize)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(self.path, "wb")
+            self._file.write(_HEADER.pack(
+                MAGIC, FORMAT_VERSION, _DTYPE_CODES[self.dtype],
+                NUM_LANDMARKS, VALUES_PER_LANDMARK, self._encoded_label,
+            ))
+            self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def append(self, landmarks: Any, timestamp: Optional[float] = None) -> None:
+        """Append a single frame of landmarks."""
+        if self._file is None:
+            self._open()
+        self._record["timestamp"] = time.time() if timestamp is None else timestamp
+        self._record["landmarks"] = landmarks_to_array(landmarks)
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+        self._unflushed += 1
+        if (self._unflushed >= FLUSH_EVERY_FRAMES
+                or time.monotonic() - self._last_flush >= FLUSH_INTERVAL_SECONDS):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> "LandmarkRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def _read_header(path: str):
+    """Return (label, landmark dtype) from a recording's header."""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{path} is too short to be a landmark recording")
+    magic, version, dtype_code, num_landmarks, values, label = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a landmark recording")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported recording version {version} in {path}")
+    if (num_landmarks, values) != (NUM_LANDMARKS, VALUES_PER_LANDMARK) or dtype_code not in _CODE_DTYPES:
+        raise ValueError(f"Unsupported landmark layout in {path}")
+    return label.rstrip(b"\0").decode("ascii"), _CODE_DTYPES[dtype_code]
+
+def load_recording(path: str) -> LandmarkRecording:
+    """Memory-map a recording without copying its frames into memory."""
+    label, dtype = _read_header(path)
+    records_dtype = record_dtype(dtype)
+    frames = (os.path.getsize(path) - HEADER_SIZE) // records_dtype.itemsize
+    if frames == 0:
+        records = np.zeros(0, dtype=records_dtype)
+    else:
+        records = np.memmap(path, dtype=records_dtype, mode="r", offset=HEADER_SIZE, shape=(frames,))
+    return LandmarkRecording(label, records["timestamp"], records["landmarks"])
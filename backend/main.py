@@ -4,18 +4,47 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import mediapipe as mp
-import numpy as np
-from PIL import Image
-import io
 import base64
 import re
+import os
+import time
+import uuid
 import json
-from enum import Enum
+import asyncio
+from contextlib import asynccontextmanager
 from typing import Tuple, Dict, List, Optional
 from food_analysis import analyze_nutrition
-from workout_data import get_workout_data, save_workout, get_user_progress
+from posture_analysis import ExerciseType, analyze_landmarks
+from workout_data import get_workout_data, save_workout, get_user_progress, WORKOUT_ROUTINES
+from recommendations import get_recommendations, refresh_recommendations_periodically
+from landmark_recording import LandmarkRecorder, FILE_EXTENSION, record_dtype
+from uploads import (
+    UploadError, UploadSizeLimitMiddleware, read_image_upload, open_image, decode_rgb, memory_budget,
+    MAX_UPLOAD_BYTES,
+)
+
+# Set to a directory to persist per-frame landmarks of each live session
+RECORDING_DIR = os.environ.get("FITPULSE_RECORDING_DIR")
+RECORDING_DTYPE = os.environ.get("FITPULSE_RECORDING_DTYPE", "float16")
+# Fail at startup rather than on the first session if the dtype is unsupported
+record_dtype(RECORDING_DTYPE)
+
+# Seconds between background refreshes of every user's recommendations; 0 disables
+RECOMMENDATION_REFRESH_SECONDS = float(os.environ.get("FITPULSE_RECOMMENDATION_REFRESH_SECONDS", "300"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    refresh_task = None
+    if RECOMMENDATION_REFRESH_SECONDS > 0:
+        refresh_task = asyncio.create_task(refresh_recommendations_periodically(RECOMMENDATION_REFRESH_SECONDS))
+    yield
+    if refresh_task is not None:
+        refresh_task.cancel()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Cap image upload bodies before they are parsed (added first so CORS wraps its 413s)
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/analyze-posture", "/analyze-nutrition"])
 
 # Add CORS middleware
 app.add_middleware(
@@ -29,32 +58,10 @@ app.add_middleware(
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 
-class ExerciseType(str, Enum):
-    SQUAT = "squat"
-    PUSHUP = "pushup"
-    PLANK = "plank"
-    LUNGE = "lunge"
-    GENERAL = "general"
-
-def get_angle(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> float:
-    """Calculate the angle between three points in degrees."""
-    ba = a - b
-    bc = c - b
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    # Ensure the value is within valid range for arccos
-    cosine_angle = np.clip(cosine_angle, -1.0, 1.0)
-    angle = np.arccos(cosine_angle)
-    return np.degrees(angle)
-
-def get_landmark_coords(landmarks, landmark_index) -> np.ndarray:
-    """Extract x, y, z coordinates from landmark."""
-    lm = landmarks[landmark_index]
-    return np.array([lm.x, lm.y, lm.z])
-
-def analyze_image_posture(image_bytes, exercise_type: ExerciseType = ExerciseType.GENERAL):
+def analyze_image_posture(image_bytes, exercise_type: ExerciseType = ExerciseType.GENERAL,
+                          recorder: Optional[LandmarkRecorder] = None):
     """Analyze posture from an image based on exercise type."""
-    image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-    img_np = np.array(image)
+    img_np = decode_rgb(image_bytes)
     
     # Process image with MediaPipe
     with mp_pose.Pose(static_image_mode=True, model_complexity=2, min_detection_confidence=0.7) as pose:
@@ -66,237 +73,22 @@ def analyze_image_posture(image_bytes, exercise_type: ExerciseType = ExerciseTyp
         # Get landmark coordinates
         lm = results.pose_landmarks.landmark
         
-        # Select analysis based on exercise type
-        if exercise_type == ExerciseType.SQUAT:
-            return analyze_squat(lm)
-        elif exercise_type == ExerciseType.PUSHUP:
-            return analyze_pushup(lm)
-        elif exercise_type == ExerciseType.PLANK:
-            return analyze_plank(lm)
-        elif exercise_type == ExerciseType.LUNGE:
-            return analyze_lunge(lm)
-        else:
-            return analyze_general_posture(lm)
-
-def analyze_squat(lm):
-    """Analyze squat posture."""
-    # Get relevant landmarks
-    left_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_HIP.value)
-    left_knee = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_KNEE.value)
-    left_ankle = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_ANKLE.value)
-    right_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_HIP.value)
-    right_knee = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_KNEE.value)
-    right_ankle = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_ANKLE.value)
-    left_shoulder = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_SHOULDER.value)
-    right_shoulder = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_SHOULDER.value)
-    
-    # Calculate angles
-    left_knee_angle = get_angle(left_hip, left_knee, left_ankle)
-    right_knee_angle = get_angle(right_hip, right_knee, right_ankle)
-    hip_knee_distance = abs(left_knee[0] - right_knee[0])
-    
-    feedback = []
-    result = "correct"
-    
-    # Check knee angle (proper squat depth)
-    avg_knee_angle = (left_knee_angle + right_knee_angle) / 2
-    if avg_knee_angle > 120:  # Not deep enough
-        feedback.append("Try to squat deeper - aim for parallel thighs to the ground")
-        result = "incorrect"
-    elif avg_knee_angle < 70:  # Too deep
-        feedback.append("You're squatting too deep, which may strain your knees")
-        result = "incorrect"
-        
-    # Check knee alignment (knees should be in line with feet)
-    if hip_knee_distance > 0.2:  # Knees caving in
-        feedback.append("Keep your knees in line with your toes - avoid letting them cave inward")
-        result = "incorrect"
-    
-    # Check back position
-    back_vector = left_shoulder - left_hip
-    vertical_vector = np.array([0, -1, 0])  # Upward direction
-    back_angle = np.degrees(np.arccos(np.dot(back_vector, vertical_vector) / 
-                                    (np.linalg.norm(back_vector) * np.linalg.norm(vertical_vector))))
-    if back_angle > 45:  # Back leaning too far forward
-        feedback.append("Keep your chest up and back straighter")
-        result = "incorrect"
-    
-    if not feedback:
-        feedback.append("Great squat form! Good depth and alignment.")
-        
-    return result, ". ".join(feedback)
-
-def analyze_pushup(lm):
-    """Analyze pushup posture."""
-    # Get relevant landmarks
-    left_shoulder = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_SHOULDER.value)
-    left_elbow = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_ELBOW.value)
-    left_wrist = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_WRIST.value)
-    right_shoulder = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_SHOULDER.value)
-    right_elbow = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_ELBOW.value)
-    right_wrist = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_WRIST.value)
-    left_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_HIP.value)
-    right_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_HIP.value)
-    left_ankle = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_ANKLE.value)
-    right_ankle = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_ANKLE.value)
-    
-    # Calculate angles and alignments
-    left_elbow_angle = get_angle(left_shoulder, left_elbow, left_wrist)
-    right_elbow_angle = get_angle(right_shoulder, right_elbow, right_wrist)
-    
-    # Check back alignment (should be straight)
-    hip_center = (left_hip + right_hip) / 2
-    shoulder_center = (left_shoulder + right_shoulder) / 2
-    ankle_center = (left_ankle + right_ankle) / 2
-    
-    # Vector from hip to shoulder and hip to ankle
-    hip_to_shoulder = shoulder_center - hip_center
-    hip_to_ankle = ankle_center - hip_center
-    
-    # Calculate alignment angle (should be close to 180 degrees for straight back)
-    alignment_angle = get_angle(shoulder_center, hip_center, ankle_center)
-    
-    feedback = []
-    result = "correct"
-    
-    # Check elbow angle (depth of pushup)
-    avg_elbow_angle = (left_elbow_angle + right_elbow_angle) / 2
-    if avg_elbow_angle > 120:  # Not bending enough
-        feedback.append("Try to lower your body more - aim for elbows at 90 degrees")
-        result = "incorrect"
-    
-    # Check back alignment
-    if not (170 < alignment_angle < 190):  # Not straight enough
-        feedback.append("Keep your back straight - avoid sagging or lifting your hips")
-        result = "incorrect"
-    
-    if not feedback:
-        feedback.append("Great pushup form! Good depth and straight body alignment.")
-        
-    return result, ". ".join(feedback)
-
-def analyze_plank(lm):
-    """Analyze plank posture."""
-    # Get relevant landmarks
-    left_shoulder = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_SHOULDER.value)
-    right_shoulder = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_SHOULDER.value)
-    left_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_HIP.value)
-    right_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_HIP.value)
-    left_ankle = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_ANKLE.value)
-    right_ankle = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_ANKLE.value)
-    
-    # Calculate body alignment
-    shoulder_center = (left_shoulder + right_shoulder) / 2
-    hip_center = (left_hip + right_hip) / 2
-    ankle_center = (left_ankle + right_ankle) / 2
-    
-    # Calculate angles for straight back
-    alignment_angle = get_angle(shoulder_center, hip_center, ankle_center)
-    
-    # Check hip position (should not be too high or too low)
-    hip_height = hip_center[1]
-    shoulder_height = shoulder_center[1]
-    hip_shoulder_height_diff = abs(hip_height - shoulder_height)
-    
-    feedback = []
-    result = "correct"
-    
-    # Check back alignment
-    if not (170 < alignment_angle < 190):
-        feedback.append("Keep your body in a straight line from head to heels")
-        result = "incorrect"
-    
-    # Check hip position
-    if hip_height > shoulder_height + 0.05:  # Hips too high
-        feedback.append("Lower your hips - they're too high")
-        result = "incorrect"
-    elif hip_height < shoulder_height - 0.05:  # Hips too low
-        feedback.append("Raise your hips - they're sagging too low")
-        result = "incorrect"
-    
-    if not feedback:
-        feedback.append("Excellent plank! Your body is in perfect alignment.")
-        
-    return result, ". ".join(feedback)
-
-def analyze_lunge(lm):
-    """Analyze lunge posture."""
-    # Get relevant landmarks
-    left_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_HIP.value)
-    left_knee = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_KNEE.value)
-    left_ankle = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_ANKLE.value)
-    right_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_HIP.value)
-    right_knee = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_KNEE.value)
-    right_ankle = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_ANKLE.value)
-    
-    # Calculate knee angles
-    left_knee_angle = get_angle(left_hip, left_knee, left_ankle)
-    right_knee_angle = get_angle(right_hip, right_knee, right_ankle)
-    
-    # Determine which leg is forward based on z position
-    if left_knee[2] < right_knee[2]:  # Left knee is forward
-        front_knee_angle = left_knee_angle
-        back_knee_angle = right_knee_angle
-    else:  # Right knee is forward
-        front_knee_angle = right_knee_angle
-        back_knee_angle = left_knee_angle
-    
-    feedback = []
-    result = "correct"
-    
-    # Check front knee angle (should be around 90 degrees)
-    if front_knee_angle < 80 or front_knee_angle > 100:
-        feedback.append("Adjust your front knee to a 90-degree angle")
-        result = "incorrect"
-    
-    # Check back knee angle (should be around 90 degrees too)
-    if back_knee_angle < 80 or back_knee_angle > 100:
-        feedback.append("Adjust your back knee to a 90-degree angle")
-        result = "incorrect"
-    
-    # Check vertical alignment of front knee (should be above ankle, not forward)
-    # This would require more complex analysis in 3D space
-    
-    if not feedback:
-        feedback.append("Great lunge form! Front and back legs are properly positioned.")
+        # Keep the raw landmarks so the session can be re-scored later
+        if recorder is not None:
+            recorder.append(lm)
         
-    return result, ". ".join(feedback)
-
-def analyze_general_posture(lm):
-    """Analyze general posture (back straightness, shoulder alignment)."""
-    # Check back straightness
-    left_shoulder = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_SHOULDER.value)
-    left_hip = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_HIP.value)
-    left_knee = get_landmark_coords(lm, mp_pose.PoseLandmark.LEFT_KNEE.value)
-    
-    # Check shoulder alignment
-    right_shoulder = get_landmark_coords(lm, mp_pose.PoseLandmark.RIGHT_SHOULDER.value)
-    shoulder_alignment = abs(left_shoulder[1] - right_shoulder[1])
-    
-    back_angle = get_angle(left_shoulder, left_hip, left_knee)
-    feedback = []
-    result = "correct"
-    
-    if not (160 < back_angle < 200):
-        feedback.append("Your back is not straight. Try to maintain a neutral spine position.")
-        result = "incorrect"
-    
-    if shoulder_alignment > 0.05:  # Threshold for uneven shoulders
-        feedback.append("Your shoulders are not level. Try to keep them even.")
-        result = "incorrect"
-    
-    if result == "correct":
-        feedback.append("Great posture! Your back is straight and shoulders are aligned.")
-    
-    return result, ". ".join(feedback)
+        return analyze_landmarks(lm, exercise_type)
 
 @app.post("/analyze-posture")
 async def analyze_posture(
     file: UploadFile = File(...),
     exercise_type: ExerciseType = Query(ExerciseType.GENERAL, description="Type of exercise being performed")
 ):
-    image_bytes = await file.read()
-    result, tips = analyze_image_posture(image_bytes, exercise_type)
+    try:
+        image_bytes = await read_image_upload(file)
+        result, tips = analyze_image_posture(image_bytes, exercise_type)
+    except UploadError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
     
     # Return the analysis result
     return JSONResponse({
@@ -312,6 +104,11 @@ async def get_available_exercises():
         "exercises": [e.value for e in ExerciseType]
     })
 
+@app.get("/upload-limits")
+async def upload_limits():
+    """Return the image upload limits and the resulting per-request memory bound."""
+    return memory_budget()
+
 @app.get("/health")
 async def health_check():
     """Simple health check endpoint."""
@@ -329,6 +126,8 @@ async def save_workout_endpoint(workout_data: Dict = Body(...)):
     try:
         result = save_workout(workout_data)
         return JSONResponse(result)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -351,9 +150,12 @@ async def user_progress_endpoint(user_id: str = "default"):
 async def nutrition_analysis_endpoint(file: UploadFile = File(...)):
     """Analyze food image for nutritional information."""
     try:
-        image_bytes = await file.read()
+        image_bytes = await read_image_upload(file)
+        open_image(image_bytes)
         result = analyze_nutrition(image_bytes)
         return JSONResponse(result)
+    except UploadError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -377,9 +179,18 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def open_session_recorder(exercise_type: ExerciseType) -> LandmarkRecorder:
+    """Start a landmark recording for a live posture session."""
+    os.makedirs(RECORDING_DIR, exist_ok=True)
+    filename = f"{exercise_type.value}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}{FILE_EXTENSION}"
+    return LandmarkRecorder(
+        os.path.join(RECORDING_DIR, filename), dtype=RECORDING_DTYPE, label=exercise_type.value
+    )
+
 @app.websocket("/ws/posture-analysis/{exercise_type}")
 async def websocket_endpoint(websocket: WebSocket, exercise_type: str):
     await manager.connect(websocket)
+    recorder = None
     try:
         # Validate the exercise type
         try:
@@ -387,6 +198,9 @@ async def websocket_endpoint(websocket: WebSocket, exercise_type: str):
         except ValueError:
             selected_exercise = ExerciseType.GENERAL
         
+        if RECORDING_DIR:
+            recorder = open_session_recorder(selected_exercise)
+        
         while True:
             # Receive the base64 image from client
             data = await websocket.receive_text()
@@ -395,10 +209,18 @@ async def websocket_endpoint(websocket: WebSocket, exercise_type: str):
             if "data:image/jpeg;base64," in data:
                 # Extract the base64 part
                 base64_data = re.sub('^data:image/jpeg;base64,', '', data)
+                # Base64 inflates by 4/3, so check the size before decoding
+                if len(base64_data) * 3 // 4 > MAX_UPLOAD_BYTES:
+                    await websocket.send_text("Image too large")
+                    continue
                 image_bytes = base64.b64decode(base64_data)
                 
                 # Analyze posture
-                result, tips = analyze_image_posture(image_bytes, selected_exercise)
+                try:
+                    result, tips = analyze_image_posture(image_bytes, selected_exercise, recorder)
+                except UploadError as e:
+                    await websocket.send_text(str(e))
+                    continue
                 
                 # Send results back
                 await websocket.send_json({
@@ -413,6 +235,9 @@ async def websocket_endpoint(websocket: WebSocket, exercise_type: str):
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
         manager.disconnect(websocket)
+    finally:
+        if recorder is not None:
+            recorder.close()
 
 # Achievement and social features
 @app.get("/achievements/{user_id}")
@@ -427,37 +252,9 @@ async def get_user_achievements(user_id: str):
     return {"achievements": achievements, "total_unlocked": len([a for a in achievements if a["unlocked"]])}
 
 @app.get("/workout-recommendations/{user_id}")
-async def get_workout_recommendations(user_id: str):
-    recommendations = [
-        {
-            "id": 1,
-            "title": "Morning Energy Boost",
-            "duration": "20 min",
-            "exercises": 8,
-            "difficulty": "beginner",
-            "category": "Cardio",
-            "description": "Perfect for starting your day with energy"
-        },
-        {
-            "id": 2,
-            "title": "Strength Builder",
-            "duration": "35 min",
-            "exercises": 12,  
-            "difficulty": "intermediate",
-            "category": "Strength",
-            "description": "Build muscle and increase strength"
-        },
-        {
-            "id": 3,
-            "title": "HIIT Challenge",
-            "duration": "25 min",
-            "exercises": 10,
-            "difficulty": "advanced", 
-            "category": "HIIT",
-            "description": "High-intensity interval training"
-        }
-    ]
-    return {"recommendations": recommendations}
+async def get_workout_recommendations(user_id: str, limit: int = Query(3, ge=1, le=len(WORKOUT_ROUTINES))):
+    """Return routines ranked for the user from their logged workouts."""
+    return {"recommendations": get_recommendations(user_id, limit)}
 
 @app.post("/social/share-progress")
 async def share_progress(data: dict = Body(...)):
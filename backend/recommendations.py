@@ -0,0 +1,152 @@
+# recommendations.py
+import asyncio
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from workout_data import (
+    WORKOUT_ROUTINES,
+    WORKOUT_SUGGESTIONS,
+    ROUTINE_DETAILS,
+    USER_WORKOUTS,
+    get_user_workouts,
+    get_workout_version,
+)
+
+# How much a routine's score comes from matching the user's history versus
+# from being something they have not done much of yet
+SIMILARITY_WEIGHT = 0.6
+NOVELTY_WEIGHT = 0.4
+DEFAULT_TOP_K = 3
+
+ROUTINE_INDEX = {name: i for i, name in enumerate(WORKOUT_ROUTINES)}
+
+def _build_routine_features() -> np.ndarray:
+    """Build L2-normalised feature vectors (exercises + category) for each routine."""
+    exercises = sorted({e for routine in WORKOUT_SUGGESTIONS.values() for e in routine})
+    categories = sorted({details["category"] for details in ROUTINE_DETAILS.values()})
+    columns = {name: i for i, name in enumerate(exercises + [f"category:{c}" for c in categories])}
+
+    features = np.zeros((len(WORKOUT_ROUTINES), len(columns)), dtype=np.float32)
+    for row, routine in enumerate(WORKOUT_ROUTINES):
+        for exercise in WORKOUT_SUGGESTIONS.get(routine, []):
+            features[row, columns[exercise]] = 1.0
+        features[row, columns[f"category:{ROUTINE_DETAILS[routine]['category']}"]] = 1.0
+
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.where(norms == 0, 1.0, norms)
+
+# Precomputed once at import: routine feature vectors and their pairwise cosine
+# similarity. A user profile is a weighted sum of routine vectors, so every
+# score can be taken straight from this matrix.
+ROUTINE_FEATURES = _build_routine_features()
+ROUTINE_SIMILARITY = ROUTINE_FEATURES @ ROUTINE_FEATURES.T
+
+# user_id -> (workout version the entry was built from, ranked recommendations).
+# Only users with saved history are cached; everyone else shares _COLD_START.
+_recommendation_cache: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}
+
+def _history_vector(workout_sets: List[Dict[str, Any]]) -> np.ndarray:
+    """Count logged sets per known routine."""
+    counts = np.zeros(len(WORKOUT_ROUTINES), dtype=np.float32)
+    for workout_set in workout_sets:
+        if not isinstance(workout_set, dict):
+            continue
+        index = ROUTINE_INDEX.get(workout_set.get("routine"))
+        if index is not None:
+            counts[index] += 1.0
+    return counts
+
+def score_routines(history: np.ndarray) -> np.ndarray:
+    """
+    Score every routine for one or more users.
+
+    `history` has shape (routines,) or (users, routines) and holds set counts.
+    Returns scores of the same shape.
+    """
+    single_user = np.ndim(history) == 1
+    history = np.atleast_2d(history).astype(np.float32)
+    projected = history @ ROUTINE_SIMILARITY
+    # |profile| = sqrt(h^T S h); the profile itself never needs materialising
+    profile_norms = np.sqrt(np.maximum((projected * history).sum(axis=1, keepdims=True), 0.0))
+    similarity = projected / np.where(profile_norms == 0, 1.0, profile_norms)
+
+    totals = history.sum(axis=1, keepdims=True)
+    novelty = 1.0 - history / np.where(totals == 0, 1.0, totals)
+
+    scores = SIMILARITY_WEIGHT * similarity + NOVELTY_WEIGHT * novelty
+    return scores[0] if single_user else scores
+
+def _format_recommendations(scores: np.ndarray) -> List[Dict[str, Any]]:
+    """Turn a row of routine scores into the ranked response payload."""
+    ranked = []
+    # Stable sort keeps the catalogue order for ties (e.g. users with no history)
+    for index in np.argsort(-scores, kind="stable"):
+        routine = WORKOUT_ROUTINES[index]
+        details = ROUTINE_DETAILS[routine]
+        ranked.append({
+            "id": int(index) + 1,
+            "title": routine,
+            "duration": f"{details['duration']} min",
+            "exercises": len(WORKOUT_SUGGESTIONS.get(routine, [])),
+            "difficulty": details["difficulty"],
+            "category": details["category"],
+            "description": details["description"],
+            "score": round(float(scores[index]), 3),
+        })
+    return ranked
+
+# Ranking for users with no history, computed once
+_COLD_START = _format_recommendations(score_routines(np.zeros(len(WORKOUT_ROUTINES), dtype=np.float32)))
+
+def get_recommendations(user_id: str = "default", top_k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+    """Return the top routines for a user, recomputing only if their workouts changed."""
+    version = get_workout_version(user_id)
+    if version == 0:
+        return _COLD_START[:top_k]
+    cached = _recommendation_cache.get(user_id)
+    if cached is None or cached[0] != version:
+        scores = score_routines(_history_vector(get_user_workouts(user_id)))
+        cached = (version, _format_recommendations(scores))
+        _recommendation_cache[user_id] = cached
+    return cached[1][:top_k]
+
+def refresh_all_recommendations(user_ids: Optional[List[str]] = None) -> int:
+    """
+    Recompute and cache recommendations for many users in one vectorised pass.
+    Returns the number of users refreshed.
+    """
+    if user_ids is None:
+        user_ids = list(USER_WORKOUTS.keys())
+    user_ids = [user_id for user_id in user_ids if get_workout_version(user_id) > 0]
+    if not user_ids:
+        return 0
+
+    versions = [get_workout_version(user_id) for user_id in user_ids]
+    history = np.stack([_history_vector(get_user_workouts(user_id)) for user_id in user_ids])
+    scores = score_routines(history)
+
+    for user_id, version, row in zip(user_ids, versions, scores):
+        _recommendation_cache[user_id] = (version, _format_recommendations(row))
+    return len(user_ids)
+
+def clear_recommendation_cache() -> None:
+    """Drop every cached recommendation."""
+    _recommendation_cache.clear()
+
+async def refresh_recommendations_periodically(interval_seconds: float) -> None:
+    """
+    Run the batch refresh every `interval_seconds` in a worker thread so the
+    event loop keeps serving requests. Meant to run as a background task.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        start = time.perf_counter()
+        try:
+            refreshed = await asyncio.to_thread(refresh_all_recommendations)
+        except Exception as e:
+            print(f"Recommendation refresh failed: {str(e)}")
+            continue
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Refreshed recommendations for {refreshed} users in {elapsed_ms:.2f} ms")
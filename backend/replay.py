@@ -0,0 +1,104 @@
+# replay.py
+# Re-run the exercise analyzers over recorded landmark sessions without inference.
+# Usage: python replay.py recordings/ --exercise squat
+import argparse
+import glob
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from posture_analysis import ExerciseType, analyze_landmarks
+from landmark_recording import FILE_EXTENSION, frame_landmarks, load_recording
+
+def replay_recording(path: str, exercise_type: Optional[ExerciseType] = None,
+                     include_frames: bool = False) -> Dict[str, Any]:
+    """
+    Score every frame of a recording and summarise the results.
+    Uses the exercise type stored in the recording unless one is given.
+    """
+    recording = load_recording(path)
+    if exercise_type is None:
+        try:
+            exercise_type = ExerciseType(recording.label)
+        except ValueError:
+            exercise_type = ExerciseType.GENERAL
+
+    results = Counter()
+    tips = Counter()
+    frames = []
+    for timestamp, frame in zip(recording.timestamps, recording.landmarks):
+        result, tip = analyze_landmarks(frame_landmarks(frame), exercise_type)
+        results[result] += 1
+        tips[tip] += 1
+        if include_frames:
+            frames.append({"timestamp": float(timestamp), "result": result, "tips": tip})
+
+    summary = {
+        "path": path,
+        "exercise_type": exercise_type.value,
+        "frames": len(recording),
+        "duration": float(recording.timestamps[-1] - recording.timestamps[0]) if len(recording) else 0.0,
+        "correct": results["correct"],
+        "incorrect": results["incorrect"],
+        "top_tips": tips.most_common(3),
+    }
+    if include_frames:
+        summary["frame_results"] = frames
+    return summary
+
+def find_recordings(paths: Iterable[str]) -> List[str]:
+    """Expand directories into the recording files they contain."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, f"*{FILE_EXTENSION}"))))
+        else:
+            found.append(path)
+    return found
+
+def replay_recordings(paths: Iterable[str], exercise_type: Optional[ExerciseType] = None,
+                      include_frames: bool = False) -> List[Dict[str, Any]]:
+    """
+    Replay many recordings (files or directories of them).
+    A file that cannot be read yields a summary with an "error" key instead.
+    """
+    summaries = []
+    for path in find_recordings(paths):
+        try:
+            summaries.append(replay_recording(path, exercise_type, include_frames))
+        except (OSError, ValueError) as e:
+            summaries.append({"path": path, "error": str(e), "frames": 0})
+    return summaries
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-score recorded posture sessions.")
+    parser.add_argument("paths", nargs="+", help="Recording files or directories")
+    parser.add_argument("--exercise", choices=[e.value for e in ExerciseType],
+                        help="Override the exercise type stored in each recording")
+    parser.add_argument("--frames", action="store_true", help="Print the result of every frame")
+    args = parser.parse_args()
+
+    exercise_type = ExerciseType(args.exercise) if args.exercise else None
+    start = time.perf_counter()
+    summaries = replay_recordings(args.paths, exercise_type, args.frames)
+    elapsed = time.perf_counter() - start
+
+    for summary in summaries:
+        if "error" in summary:
+            print(f"{summary['path']}: skipped ({summary['error']})")
+            continue
+        print(f"{summary['path']}: {summary['exercise_type']}, {summary['frames']} frames, "
+              f"{summary['correct']} correct / {summary['incorrect']} incorrect")
+        for tip, count in summary["top_tips"]:
+            print(f"    {count:5d}x {tip}")
+        for frame in summary.get("frame_results", []):
+            print(f"    {frame['timestamp']:.3f} {frame['result']}: {frame['tips']}")
+
+    total_frames = sum(s["frames"] for s in summaries)
+    rate = total_frames / elapsed if elapsed > 0 else 0.0
+    replayed = sum(1 for s in summaries if "error" not in s)
+    print(f"Replayed {total_frames} frames from {replayed} recordings in {elapsed:.2f}s ({rate:.0f} frames/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# uploads.py
+import io
+import threading
+from typing import Any, Dict, Iterable, Optional, Union
+
+import numpy as np
+from fastapi import UploadFile
+from fastapi.responses import JSONResponse
+from PIL import Image
+from starlette.datastructures import Headers
+
+# Limits applied to every uploaded or streamed image
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 4096 * 4096
+CHUNK_SIZE = 64 * 1024
+
+# Whole request body allowed on upload routes: the image plus room for the
+# multipart boundaries and part headers
+MAX_UPLOAD_BODY_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+
+# Leading bytes needed to tell the supported formats apart
+_SNIFF_BYTES = 12
+
+# Rows converted per step when copying a decoded image into the RGB buffer
+_COPY_ROWS = 64
+
+# Transient bytes per pixel while decoding, on top of the reusable RGB buffer.
+# Measured as the max RSS growth of decode_rgb() with the buffer already
+# allocated, on 4096x4096 images in L, P, RGB and RGBA modes (worst mode per
+# format, rounded up). Pillow's decoded image alone is 4 (RGB is stored
+# padded); PNG adds zlib state and libwebp keeps its own decode buffers.
+DECODE_BYTES_PER_PIXEL = {"JPEG": 6, "PNG": 8, "WEBP": 20}
+
+_buffers = threading.local()
+
+class UploadError(Exception):
+    """Raised when an upload is rejected; carries the HTTP status to return."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """Return the Pillow format name for a supported image header, else None."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized request bodies on the given paths before form parsing.
+
+    Starlette spools multipart files to disk with no size cap before the
+    handler runs, so the limit has to be enforced on the raw body: up front
+    from Content-Length, and while streaming by counting received bytes.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_body_size: int = MAX_UPLOAD_BODY_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    raise UploadError(self._message(), 413)
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # Once over the limit, drop whatever error the app produces and send 413 below
+            if exceeded:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not response_started:
+            await self._reject(scope, receive, send)
+
+    def _message(self) -> str:
+        return f"Image exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit"
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(status_code=413, content={"error": self._message()})
+        await response(scope, receive, send)
+
+async def read_image_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Read an uploaded image in chunks, checking its size and format as it goes.
+    The request body itself is capped earlier by UploadSizeLimitMiddleware.
+    """
+    size = getattr(file, "size", None)
+    if size is not None and size > max_bytes:
+        raise UploadError(f"Image exceeds the {max_bytes // (1024 * 1024)} MB upload limit", 413)
+
+    data = bytearray()
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if len(data) + len(chunk) > max_bytes:
+            raise UploadError(f"Image exceeds the {max_bytes // (1024 * 1024)} MB upload limit", 413)
+        sniffed = len(data) >= _SNIFF_BYTES
+        data += chunk
+        if not sniffed and len(data) >= _SNIFF_BYTES and sniff_image_format(data) is None:
+            raise UploadError("Unsupported image format; upload a JPEG, PNG or WebP image", 415)
+
+    if not data:
+        raise UploadError("Uploaded file is empty")
+    if sniff_image_format(data) is None:
+        raise UploadError("Unsupported image format; upload a JPEG, PNG or WebP image", 415)
+    # io.BytesIO shares a bytes object but copies a bytearray, so convert once here
+    return bytes(data)
+
+def open_image(data: Union[bytes, bytearray], max_pixels: int = MAX_IMAGE_PIXELS) -> Image.Image:
+    """Open an image lazily (header only) and check its format and pixel count."""
+    image_format = sniff_image_format(bytes(data[:_SNIFF_BYTES]))
+    if image_format is None:
+        raise UploadError("Unsupported image format; upload a JPEG, PNG or WebP image", 415)
+    try:
+        image = Image.open(io.BytesIO(data), formats=[image_format])
+    except Exception:
+        raise UploadError("Could not read image")
+
+    width, height = image.size
+    if width * height > max_pixels:
+        raise UploadError(f"Image is {width}x{height}; at most {max_pixels} pixels are allowed", 413)
+    return image
+
+def _rgb_buffer(height: int, width: int) -> np.ndarray:
+    """
+    Return a (height, width, 3) view into this thread's reusable RGB buffer.
+    The buffer only grows, up to MAX_IMAGE_PIXELS * 3 bytes.
+    """
+    needed = height * width * 3
+    buffer = getattr(_buffers, "rgb", None)
+    if buffer is None or buffer.size < needed:
+        buffer = np.empty(needed, dtype=np.uint8)
+        _buffers.rgb = buffer
+    return buffer[:needed].reshape(height, width, 3)
+
+def decode_rgb(data: Union[bytes, bytearray], max_pixels: int = MAX_IMAGE_PIXELS) -> np.ndarray:
+    """
+    Decode an image into this thread's reusable (height, width, 3) RGB buffer.
+    The returned array is only valid until the next call on the same thread.
+    """
+    image = open_image(data, max_pixels)
+    try:
+        image.load()
+    except Exception:
+        raise UploadError("Could not decode image")
+
+    # np.asarray(image) and image.convert() each make full-size temporary
+    # copies; filling the buffer a band at a time keeps temporaries small
+    width, height = image.size
+    rgb = _rgb_buffer(height, width)
+    for top in range(0, height, _COPY_ROWS):
+        bottom = min(top + _COPY_ROWS, height)
+        band = image.crop((0, top, width, bottom))
+        if band.mode != "RGB":
+            band = band.convert("RGB")
+        rgb[top:bottom] = np.asarray(band)
+    return rgb
+
+def memory_budget() -> Dict[str, Any]:
+    """Describe the per-request memory bound for image uploads."""
+    buffer = getattr(_buffers, "rgb", None)
+    return {
+        "max_upload_bytes": MAX_UPLOAD_BYTES,
+        "max_request_body_bytes": MAX_UPLOAD_BODY_BYTES,
+        "max_image_pixels": MAX_IMAGE_PIXELS,
+        "decode_bytes_per_pixel": DECODE_BYTES_PER_PIXEL,
+        # Upload read into memory plus the worst-case transient decode of a max-size image
+        "max_request_bytes": MAX_UPLOAD_BYTES + MAX_IMAGE_PIXELS * max(DECODE_BYTES_PER_PIXEL.values()),
+        # Resident per thread, reused across requests
+        "max_rgb_buffer_bytes": MAX_IMAGE_PIXELS * 3,
+        "rgb_buffer_bytes": 0 if buffer is None else int(buffer.nbytes),
+    }
@@ -1,4 +1,5 @@
 # workout_data.py
+from collections import defaultdict
 from typing import Dict, List, Any
 
 # Mock workout data that would normally come from a database
@@ -22,6 +23,30 @@ WORKOUT_SUGGESTIONS = {
   "Core Blast": ["Planks", "Russian Twists", "Dead Bugs", "Bicycle Crunches"]
 }
 
+# Display metadata used when a routine is served as a recommendation
+ROUTINE_DETAILS = {
+  "Chest Day": {"category": "Strength", "difficulty": "intermediate", "duration": 40,
+                "description": "Press and fly variations for a stronger chest"},
+  "Legs": {"category": "Strength", "difficulty": "intermediate", "duration": 45,
+           "description": "Compound lifts to build lower-body power"},
+  "Full Body": {"category": "Strength", "difficulty": "advanced", "duration": 50,
+                "description": "Hit every major muscle group in one session"},
+  "Back & Biceps": {"category": "Strength", "difficulty": "intermediate", "duration": 40,
+                    "description": "Pulling movements for a wider back and bigger arms"},
+  "Shoulders & Triceps": {"category": "Strength", "difficulty": "intermediate", "duration": 35,
+                          "description": "Pressing work for shoulders and arms"},
+  "HIIT Cardio": {"category": "HIIT", "difficulty": "advanced", "duration": 25,
+                  "description": "High-intensity intervals to boost conditioning"},
+  "Core Blast": {"category": "Core", "difficulty": "beginner", "duration": 20,
+                 "description": "Short core circuit for stability and control"}
+}
+
+# In-memory workout history keyed by user id, standing in for a database table
+USER_WORKOUTS: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+
+# Bumped on every save so caches derived from a user's history can detect staleness
+_workout_versions: Dict[str, int] = defaultdict(int)
+
 def get_workout_data() -> Dict[str, Any]:
     """Return all workout routines and suggestions"""
     return {
@@ -29,20 +54,36 @@ def get_workout_data() -> Dict[str, Any]:
         "suggestions": WORKOUT_SUGGESTIONS
     }
 
+def get_user_workouts(user_id: str = "default") -> List[Dict[str, Any]]:
+    """Return the workout sets recorded for a user"""
+    return USER_WORKOUTS.get(user_id, [])
+
+def get_workout_version(user_id: str = "default") -> int:
+    """Return a counter that changes whenever the user's workouts change"""
+    return _workout_versions.get(user_id, 0)
+
 def save_workout(workout_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     In a real application, this would save the workout data to a database
-    For now, we'll just return a success message
+    For now, we keep the sets in memory so recommendations can use them
     """
     # Here you would normally:
     # 1. Validate the input data
     # 2. Connect to a database
     # 3. Save the workout data
     # 4. Return a success response or error
+    user_id = workout_data.get("userId", "default")
+    sets = workout_data.get("workoutSets", [])
+    if not isinstance(user_id, str):
+        raise ValueError("userId must be a string")
+    if not isinstance(sets, list) or not all(isinstance(s, dict) for s in sets):
+        raise ValueError("workoutSets must be a list of sets")
+    USER_WORKOUTS[user_id].extend(sets)
+    _workout_versions[user_id] += 1
     
     return {
         "status": "success",
-        "message": f"Successfully saved workout with {len(workout_data.get('workoutSets', []))} sets"
+        "message": f"Successfully saved workout with {len(sets)} sets"
     }
 
 def get_user_progress(user_id: str = "default") -> Dict[str, Any]: